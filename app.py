@@ -1,11 +1,21 @@
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
 from datetime import datetime, date
 import json
+import math
+import os
+
+from utils.data_processor import VehicleDataProcessor
+from utils.dataset_refresher import DatasetRefresher
+from utils.shared_dataset import SharedDatasetStore
+
+# Directory of the shared dataset store; when set, all server processes
+# attach to the same memory-mapped copy of the data
+DATA_STORE_DIR = os.environ.get('VEHICLE_DATA_STORE')
+# Directory of <year>-<quarter>.csv partitions merged in as they change
+PARTITION_DIR = os.environ.get('VEHICLE_PARTITION_DIR')
 
 # Page configuration
 st.set_page_config(
@@ -43,73 +53,37 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class VehicleDataProcessor:
-    def __init__(self):
-        self.data = self.generate_sample_data()
-
-    def generate_sample_data(self):
-        """Generate sample vehicle registration data"""
-        np.random.seed(42)
-
-        states = ['Maharashtra', 'Gujarat', 'Tamil Nadu', 'Karnataka', 'Delhi', 'Uttar Pradesh']
-        categories = ['2-Wheeler', '3-Wheeler', '4-Wheeler', 'Commercial Vehicle']
-        manufacturers = ['Hero MotoCorp', 'Honda Motorcycle', 'Maruti Suzuki', 'Bajaj Auto', 
-                        'TVS Motor', 'Tata Motors', 'Hyundai', 'Mahindra']
-        years = [2021, 2022, 2023, 2024]
-        quarters = ['Q1', 'Q2', 'Q3', 'Q4']
-
-        data = []
-        for year in years:
-            for quarter in quarters:
-                for state in states:
-                    for category in categories:
-                        for manufacturer in manufacturers:
-                            if np.random.random() > 0.7:  # Not all combinations exist
-                                continue
-
-                            base_registrations = np.random.randint(10000, 200000)
-                            yoy_growth = np.random.normal(8, 15)  # 8% average with 15% std dev
-                            qoq_growth = np.random.normal(2, 8)   # 2% average with 8% std dev
-
-                            data.append({
-                                'year': year,
-                                'quarter': quarter,
-                                'state': state,
-                                'category': category,
-                                'manufacturer': manufacturer,
-                                'registrations': base_registrations,
-                                'yoy_growth': yoy_growth,
-                                'qoq_growth': qoq_growth,
-                                'date_period': f"{year}-{quarter}"
-                            })
-
-        return pd.DataFrame(data)
-
-    def calculate_summary_metrics(self, df):
-        """Calculate key summary metrics"""
-        total_registrations = df['registrations'].sum()
-        avg_yoy_growth = df['yoy_growth'].mean()
-        avg_qoq_growth = df['qoq_growth'].mean()
-
-        top_category = df.groupby('category')['registrations'].sum().idxmax()
-        top_manufacturer = df.groupby('manufacturer')['registrations'].sum().idxmax()
-        top_state = df.groupby('state')['registrations'].sum().idxmax()
-
-        return {
-            'total_registrations': total_registrations,
-            'avg_yoy_growth': avg_yoy_growth,
-            'avg_qoq_growth': avg_qoq_growth,
-            'top_category': top_category,
-            'top_manufacturer': top_manufacturer,
-            'top_state': top_state
-        }
-
 @st.cache_data
 def load_vehicle_data():
     """Load and cache vehicle data"""
     processor = VehicleDataProcessor()
     return processor.data
 
+@st.cache_resource(max_entries=2)
+def attach_shared_vehicle_data(store_dir, version):
+    """Attach to a shared dataset version (one read-only mapping per process)"""
+    return SharedDatasetStore(store_dir).attach(version)
+
+@st.cache_resource
+def get_dataset_refresher(partition_dir):
+    """Start one background refresher per process for the partition directory"""
+    refresher = DatasetRefresher(partition_dir, base_df=VehicleDataProcessor().data)
+    refresher.refresh()
+    return refresher.start()
+
+def get_vehicle_data():
+    """Return the dashboard dataset from the shared store if configured"""
+    if not DATA_STORE_DIR:
+        if PARTITION_DIR:
+            # With a shared store, partitions are published by a standalone refresher instead
+            return get_dataset_refresher(PARTITION_DIR).snapshot()[1]
+        return load_vehicle_data()
+
+    store = SharedDatasetStore(DATA_STORE_DIR)
+    version = store.publish_if_missing(lambda: VehicleDataProcessor().data)
+
+    return attach_shared_vehicle_data(DATA_STORE_DIR, version)
+
 def create_sidebar_filters(df):
     """Create sidebar filters"""
     st.sidebar.header("🔍 Data Filters")
@@ -181,7 +155,7 @@ def display_metrics(df):
     with col2:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{metrics['avg_yoy_growth']:.1f}%</div>
+            <div class="metric-value">{format_growth(metrics['avg_yoy_growth'])}</div>
             <div class="metric-label">Avg YoY Growth</div>
         </div>
         """, unsafe_allow_html=True)
@@ -189,7 +163,7 @@ def display_metrics(df):
     with col3:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{metrics['avg_qoq_growth']:.1f}%</div>
+            <div class="metric-value">{format_growth(metrics['avg_qoq_growth'])}</div>
             <div class="metric-label">Avg QoQ Growth</div>
         </div>
         """, unsafe_allow_html=True)
@@ -205,7 +179,7 @@ def display_metrics(df):
 def create_yoy_trend_chart(df):
     """Create YoY trend chart"""
     # Aggregate data by year and category
-    yoy_data = df.groupby(['year', 'category'])['registrations'].sum().reset_index()
+    yoy_data = df.groupby(['year', 'category'], observed=True)['registrations'].sum().reset_index()
 
     fig = px.line(
         yoy_data,
@@ -226,10 +200,16 @@ def create_yoy_trend_chart(df):
 
     return fig
 
+def format_growth(value):
+    """Format a growth rate, showing N/A when there is no earlier period to compare"""
+    if math.isnan(value):
+        return "N/A"
+    return f"{value:.1f}%"
+
 def create_qoq_growth_chart(df):
     """Create QoQ growth chart"""
-    qoq_data = df.groupby(['year', 'quarter'])['qoq_growth'].mean().reset_index()
-    qoq_data['period'] = qoq_data['year'].astype(str) + '-' + qoq_data['quarter']
+    qoq_data = df.groupby(['year', 'quarter'], observed=True)['qoq_growth'].mean().dropna().reset_index()
+    qoq_data['period'] = qoq_data['year'].astype(str) + '-' + qoq_data['quarter'].astype(str)
 
     fig = px.bar(
         qoq_data,
@@ -252,7 +232,7 @@ def create_qoq_growth_chart(df):
 
 def create_manufacturer_pie_chart(df):
     """Create manufacturer market share pie chart"""
-    manufacturer_data = df.groupby('manufacturer')['registrations'].sum().sort_values(ascending=False)
+    manufacturer_data = df.groupby('manufacturer', observed=True)['registrations'].sum().sort_values(ascending=False)
 
     # Take top 8 manufacturers and group rest as 'Others'
     top_manufacturers = manufacturer_data.head(8)
@@ -278,7 +258,7 @@ def create_manufacturer_pie_chart(df):
 
 def create_state_wise_chart(df):
     """Create state-wise registration chart"""
-    state_data = df.groupby('state')['registrations'].sum().sort_values(ascending=True)
+    state_data = df.groupby('state', observed=True)['registrations'].sum().sort_values(ascending=True)
 
     fig = px.bar(
         x=state_data.values,
@@ -299,6 +279,18 @@ def create_state_wise_chart(df):
 
     return fig
 
+def create_key_insights(df):
+    """Create key insights markdown for the sidebar"""
+    category_yoy = df.groupby('category', observed=True)['yoy_growth'].mean().dropna()
+    growth_category = category_yoy.idxmax() if not category_yoy.empty else "N/A"
+
+    return f"""
+    1. **Market Leader**: {df.groupby('manufacturer', observed=True)['registrations'].sum().idxmax()}
+    2. **Top State**: {df.groupby('state', observed=True)['registrations'].sum().idxmax()}
+    3. **Growth Category**: {growth_category}
+    4. **Total Market**: {df['registrations'].sum():,} registrations
+    """
+
 def main():
     """Main dashboard function"""
     # Header
@@ -307,7 +299,7 @@ def main():
     st.markdown("---")
 
     # Load data
-    df = load_vehicle_data()
+    df = get_vehicle_data()
 
     # Create filters
     filters = create_sidebar_filters(df)
@@ -345,17 +337,20 @@ def main():
 
         # YoY growth by category
         st.subheader("YoY Growth Rate by Category")
-        category_yoy = filtered_df.groupby('category')['yoy_growth'].mean().sort_values(ascending=False)
-
-        fig_yoy_cat = px.bar(
-            x=category_yoy.index,
-            y=category_yoy.values,
-            title="Average YoY Growth Rate by Vehicle Category",
-            labels={'x': 'Vehicle Category', 'y': 'YoY Growth Rate (%)'},
-            color=category_yoy.values,
-            color_continuous_scale='RdYlGn'
-        )
-        st.plotly_chart(fig_yoy_cat, use_container_width=True)
+        category_yoy = filtered_df.groupby('category', observed=True)['yoy_growth'].mean().dropna().sort_values(ascending=False)
+
+        if category_yoy.empty:
+            st.info("No YoY growth data for the selected filters (no earlier year to compare).")
+        else:
+            fig_yoy_cat = px.bar(
+                x=category_yoy.index,
+                y=category_yoy.values,
+                title="Average YoY Growth Rate by Vehicle Category",
+                labels={'x': 'Vehicle Category', 'y': 'YoY Growth Rate (%)'},
+                color=category_yoy.values,
+                color_continuous_scale='RdYlGn'
+            )
+            st.plotly_chart(fig_yoy_cat, use_container_width=True)
 
     with tab3:
         st.subheader("Quarter-over-Quarter Analysis")
@@ -368,17 +363,17 @@ def main():
 
         insight_col1, insight_col2, insight_col3 = st.columns(3)
         with insight_col1:
-            st.metric("Max QoQ Growth", f"{qoq_stats['max']:.1f}%")
+            st.metric("Max QoQ Growth", format_growth(qoq_stats['max']))
         with insight_col2:
-            st.metric("Min QoQ Growth", f"{qoq_stats['min']:.1f}%")
+            st.metric("Min QoQ Growth", format_growth(qoq_stats['min']))
         with insight_col3:
-            st.metric("Median QoQ Growth", f"{qoq_stats['50%']:.1f}%")
+            st.metric("Median QoQ Growth", format_growth(qoq_stats['50%']))
 
     with tab4:
         st.subheader("Manufacturer Analysis")
 
         # Top 10 manufacturers
-        top_manufacturers = filtered_df.groupby('manufacturer')['registrations'].sum().sort_values(ascending=False).head(10)
+        top_manufacturers = filtered_df.groupby('manufacturer', observed=True)['registrations'].sum().sort_values(ascending=False).head(10)
 
         fig_top_mfg = px.bar(
             x=top_manufacturers.index,
@@ -393,7 +388,7 @@ def main():
 
         # Manufacturer performance by category
         st.subheader("Manufacturer Performance by Category")
-        mfg_category = filtered_df.groupby(['manufacturer', 'category'])['registrations'].sum().unstack(fill_value=0)
+        mfg_category = filtered_df.groupby(['manufacturer', 'category'], observed=True)['registrations'].sum().unstack(fill_value=0)
 
         fig_heatmap = px.imshow(
             mfg_category.values,
@@ -464,14 +459,7 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 🎯 Key Insights")
 
-    insights = f"""
-    1. **Market Leader**: {filtered_df.groupby('manufacturer')['registrations'].sum().idxmax()}
-    2. **Top State**: {filtered_df.groupby('state')['registrations'].sum().idxmax()}
-    3. **Growth Category**: {filtered_df.groupby('category')['yoy_growth'].mean().idxmax()}
-    4. **Total Market**: {filtered_df['registrations'].sum():,} registrations
-    """
-
-    st.sidebar.markdown(insights)
+    st.sidebar.markdown(create_key_insights(filtered_df))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,6 @@
+
+import os
+import sys
+
+# Make the app module and the utils package importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
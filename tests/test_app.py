@@ -0,0 +1,85 @@
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+pytest.importorskip('plotly')
+
+from streamlit.testing.v1 import AppTest
+
+import app
+from utils.data_processor import VehicleDataProcessor
+from utils.dataset_refresher import DatasetRefresher
+from utils.shared_dataset import SharedDatasetStore
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+NEW_MANUFACTURER = 'Ather Energy'
+
+@pytest.fixture
+def partition_dir(tmp_path):
+    """A partition for a manufacturer with no history, so all its growth is NaN"""
+    pd.DataFrame([
+        {'year': 2024, 'quarter': 'Q4', 'state': 'Delhi', 'category': '2-Wheeler',
+         'manufacturer': NEW_MANUFACTURER, 'registrations': 500},
+        {'year': 2024, 'quarter': 'Q4', 'state': 'Gujarat', 'category': '2-Wheeler',
+         'manufacturer': NEW_MANUFACTURER, 'registrations': 300}
+    ]).to_csv(tmp_path / '2024-Q4.csv', index=False)
+    return str(tmp_path)
+
+@pytest.fixture(params=['in_memory', 'shared_store'])
+def dashboard_df(request, tmp_path):
+    df = VehicleDataProcessor().data
+    if request.param == 'shared_store':
+        store = SharedDatasetStore(str(tmp_path))
+        df = store.attach(store.publish(df))
+
+    filters = {
+        'years': sorted(df['year'].unique()),
+        'states': sorted(df['state'].unique())[:3],
+        'categories': sorted(df['category'].unique()),
+        'manufacturers': sorted(df['manufacturer'].unique())[:5]
+    }
+    return app.filter_dataframe(df, filters)
+
+def test_charts_render(dashboard_df):
+    assert app.create_yoy_trend_chart(dashboard_df).data
+    assert app.create_manufacturer_pie_chart(dashboard_df).data
+    assert app.create_state_wise_chart(dashboard_df).data
+
+    fig = app.create_qoq_growth_chart(dashboard_df)
+    assert all('-Q' in period for period in fig.data[0].x)
+
+def test_summary_metrics(dashboard_df):
+    metrics = VehicleDataProcessor().calculate_summary_metrics(dashboard_df)
+
+    assert metrics['total_registrations'] == dashboard_df['registrations'].sum()
+    assert metrics['top_state'] in set(dashboard_df['state'])
+
+def test_dashboard_handles_missing_growth(partition_dir):
+    refresher = DatasetRefresher(partition_dir, base_df=VehicleDataProcessor().data)
+    refresher.refresh()
+    df = refresher.snapshot()[1]
+    new_rows = df[df['manufacturer'] == NEW_MANUFACTURER]
+    assert new_rows['yoy_growth'].isna().all() and new_rows['qoq_growth'].isna().all()
+
+    assert 'Growth Category**: N/A' in app.create_key_insights(new_rows)
+    assert app.format_growth(new_rows['yoy_growth'].mean()) == 'N/A'
+    assert len(app.create_qoq_growth_chart(new_rows).data[0].x) == 0
+
+def test_main_renders_refreshed_frame_with_missing_growth(partition_dir, monkeypatch):
+    monkeypatch.setenv('VEHICLE_PARTITION_DIR', partition_dir)
+    monkeypatch.delenv('VEHICLE_DATA_STORE', raising=False)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=30).run()
+    assert not at.exception
+
+    manufacturers = at.sidebar.multiselect[3]
+    assert NEW_MANUFACTURER in manufacturers.options
+    manufacturers.set_value([NEW_MANUFACTURER])
+    at.sidebar.multiselect[0].set_value([2024])
+    at.run()
+
+    assert not at.exception
+    assert any('Growth Category**: N/A' in markdown.value for markdown in at.sidebar.markdown)
@@ -0,0 +1,89 @@
+
+import pytest
+
+from utils.data_processor import VahanDataProcessor, VehicleDataProcessor
+
+@pytest.fixture(scope='module')
+def sample_df():
+    return VehicleDataProcessor().data
+
+@pytest.fixture
+def processor():
+    return VahanDataProcessor()
+
+def test_filter_data(processor, sample_df):
+    filtered = processor.filter_data(sample_df, {'years': [2024], 'states': ['Delhi']})
+
+    assert len(filtered) > 0
+    assert set(filtered['year']) == {2024}
+    assert set(filtered['state']) == {'Delhi'}
+
+def test_run_query_totals(processor, sample_df):
+    result = processor.run_query(sample_df, {'measures': ['registrations', 'records']})
+
+    assert len(result) == 1
+    assert result.loc[0, 'registrations'] == sample_df['registrations'].sum()
+    assert result.loc[0, 'records'] == len(sample_df)
+
+def test_run_query_state_ranking(processor, sample_df):
+    result = processor.run_query(sample_df, {
+        'filters': {'years': [2024]},
+        'group_by': ['state'],
+        'measures': ['registrations', 'market_share', 'rank'],
+        'sort_by': 'registrations',
+        'limit': 3
+    })
+
+    expected = sample_df[sample_df['year'] == 2024].groupby('state')['registrations'].sum()
+    expected = expected.sort_values(ascending=False)
+
+    assert list(result.columns) == ['state', 'registrations', 'market_share', 'rank']
+    assert result['state'].tolist() == expected.index[:3].tolist()
+    assert result['rank'].tolist() == [1, 2, 3]
+    assert result.loc[0, 'market_share'] == pytest.approx(expected.iloc[0] / expected.sum() * 100)
+
+def test_run_query_null_fields_use_defaults(processor, sample_df):
+    result = processor.run_query(sample_df, {'filters': None, 'group_by': None, 'measures': None, 'limit': None})
+
+    assert list(result.columns) == ['registrations']
+    assert result.loc[0, 'registrations'] == sample_df['registrations'].sum()
+
+def test_run_query_growth_measures(processor, sample_df):
+    result = processor.run_query(sample_df, {
+        'group_by': ['year', 'quarter'],
+        'measures': ['avg_yoy_growth', 'avg_qoq_growth']
+    })
+
+    expected = sample_df.groupby(['year', 'quarter'])['qoq_growth'].mean()
+    assert len(result) == len(expected)
+    assert result['avg_qoq_growth'].tolist() == pytest.approx(expected.tolist())
+
+@pytest.mark.parametrize('spec, message', [
+    ({'group_by': 'state'}, "'group_by' must be a list"),
+    ({'group_by': ['state', 'state']}, "duplicate"),
+    ({'group_by': ['colour']}, "Unknown group_by column"),
+    ({'measures': ['registrations', 'registrations']}, "duplicate"),
+    ({'measures': ['speed']}, "Unknown measure"),
+    ({'measures': 'registrations'}, "'measures' must be a list"),
+    ({'filters': {'years': [{'a': 1}]}}, "strings or numbers"),
+    ({'filters': {'years': 2024}}, "must be a list"),
+    ({'filters': {'colours': ['red']}}, "Unknown filter"),
+    ({'filters': ['years']}, "'filters' must be an object"),
+    ({'sort_by': ['registrations']}, "'sort_by' must be a column name"),
+    ({'sort_by': 'state'}, "Cannot sort by"),
+    ({'ascending': 'yes'}, "'ascending'"),
+    ({'limit': -1}, "positive integer"),
+    ({'limit': 0}, "positive integer"),
+    ({'limit': '5'}, "positive integer"),
+    ({'limit': True}, "positive integer"),
+    ({'order': 'desc'}, "Unknown query fields"),
+    ({'group_by': ''}, "'group_by' must be a list"),
+    ({'filters': []}, "'filters' must be an object"),
+    ({'measures': 0}, "'measures' must be a list"),
+    ({'measures': []}, "must not be empty"),
+    ({'sort_by': ''}, "Cannot sort by"),
+    ({'ascending': 0}, "'ascending'"),
+])
+def test_run_query_rejects_invalid_spec(processor, sample_df, spec, message):
+    with pytest.raises(ValueError, match=message):
+        processor.run_query(sample_df, spec)
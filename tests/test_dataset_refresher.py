@@ -0,0 +1,181 @@
+
+import asyncio
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from utils.data_processor import VahanDataProcessor, VehicleDataProcessor
+from utils.dataset_refresher import DatasetRefresher
+
+def write_partition(directory, year, quarter, rows, manufacturer='Hero MotoCorp'):
+    """Write a partition file the way VahanScraper.save_partitions does"""
+    df = pd.DataFrame([
+        {'year': year, 'quarter': quarter, 'state': state, 'category': '2-Wheeler',
+         'manufacturer': manufacturer, 'registrations': registrations}
+        for state, registrations in rows.items()
+    ])
+    path = os.path.join(directory, f"{year}-{quarter}.csv")
+    tmp_path = os.path.join(directory, f".{year}-{quarter}.csv.tmp")
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def rows_for(frame, year, quarter):
+    return frame[(frame['year'] == year) & (frame['quarter'] == quarter)].set_index('state')
+
+def test_added_partitions_are_merged_with_growth(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    write_partition(tmp_path, 2024, 'Q1', {'Delhi': 100, 'Gujarat': 50})
+    write_partition(tmp_path, 2024, 'Q2', {'Delhi': 150})
+
+    assert refresher.refresh()
+    version, frame = refresher.snapshot()
+
+    assert version == frame.attrs['dataset_version'] == 1
+    assert len(frame) == 3
+    assert rows_for(frame, 2024, 'Q2').loc['Delhi', 'qoq_growth'] == pytest.approx(50.0)
+    assert rows_for(frame, 2024, 'Q2').loc['Delhi', 'date_period'] == '2024-Q2'
+    assert pd.isna(rows_for(frame, 2024, 'Q1').loc['Delhi', 'qoq_growth'])
+    assert not refresher.refresh()
+
+def test_changed_partition_updates_dependent_quarters(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    write_partition(tmp_path, 2023, 'Q4', {'Delhi': 100})
+    write_partition(tmp_path, 2024, 'Q1', {'Delhi': 120})
+    write_partition(tmp_path, 2024, 'Q4', {'Delhi': 300})
+    write_partition(tmp_path, 2025, 'Q1', {'Delhi': 240})
+    refresher.refresh()
+
+    # Rewriting 2024-Q4 affects 2025-Q1 (next quarter), and 2023-Q4 feeds 2024-Q4 (next year)
+    write_partition(tmp_path, 2024, 'Q4', {'Delhi': 200})
+    assert refresher.refresh()
+    version, frame = refresher.snapshot()
+
+    assert version == 2
+    assert len(frame) == 4
+    assert rows_for(frame, 2024, 'Q4').loc['Delhi', 'registrations'] == 200
+    assert rows_for(frame, 2024, 'Q4').loc['Delhi', 'yoy_growth'] == pytest.approx(100.0)
+    assert rows_for(frame, 2025, 'Q1').loc['Delhi', 'qoq_growth'] == pytest.approx(20.0)
+    assert rows_for(frame, 2025, 'Q1').loc['Delhi', 'yoy_growth'] == pytest.approx(100.0)
+
+def test_removed_partition_restores_base_rows(tmp_path):
+    base_df = VehicleDataProcessor().data
+    base_q4 = rows_for(base_df, 2024, 'Q4')
+    refresher = DatasetRefresher(str(tmp_path), base_df=base_df)
+
+    path = write_partition(tmp_path, 2024, 'Q4', {'Delhi': 10})
+    write_partition(tmp_path, 2025, 'Q1', {'Delhi': 20})
+    refresher.refresh()
+    assert len(rows_for(refresher.snapshot()[1], 2024, 'Q4')) == 1
+
+    os.remove(path)
+    assert refresher.refresh()
+    frame = refresher.snapshot()[1]
+    restored = rows_for(frame, 2024, 'Q4')
+
+    assert len(frame) == len(base_df) + 1
+    assert restored['registrations'].sum() == base_q4['registrations'].sum()
+    assert restored['yoy_growth'].sum() == pytest.approx(base_q4['yoy_growth'].sum())
+    assert rows_for(frame, 2025, 'Q1').loc['Delhi', 'registrations'] == 20
+
+def test_removed_partition_without_base_is_dropped(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    path = write_partition(tmp_path, 2025, 'Q1', {'Delhi': 20})
+    refresher.refresh()
+
+    os.remove(path)
+    assert refresher.refresh()
+
+    assert refresher.snapshot()[1].empty
+    assert refresher.totals('state').empty
+
+def test_totals_follow_merged_partitions(tmp_path):
+    base_df = VehicleDataProcessor().data
+    refresher = DatasetRefresher(str(tmp_path), base_df=base_df)
+    write_partition(tmp_path, 2024, 'Q4', {'Delhi': 10})
+    refresher.refresh()
+    version, frame = refresher.snapshot()
+
+    expected = frame.groupby('state')['registrations'].sum()
+    pd.testing.assert_series_equal(refresher.totals('state', version), expected, check_names=False)
+    assert refresher.totals('state', version - 1) is None
+
+def test_query_service_serves_totals_from_refresher(tmp_path):
+    pytest.importorskip('aiohttp')
+    from utils.query_api import QueryService
+
+    write_partition(tmp_path, 2024, 'Q4', {'Delhi': 10})
+    spec = {'group_by': ['state'], 'measures': ['registrations', 'market_share', 'rank'], 'sort_by': 'rank',
+            'ascending': True}
+
+    async def scenario():
+        service = QueryService(partition_dir=str(tmp_path))
+        body = json.loads(await service.query(spec))
+        version, frame = service.snapshot()
+        service.close()
+        return service, version, frame, body
+
+    service, version, frame, body = asyncio.run(scenario())
+    expected = VahanDataProcessor().run_query(frame, spec)
+
+    assert version == body['dataset_version'] == 1
+    assert service.refresher.totals('state', version) is not None
+    assert body['rows'] == json.loads(expected.to_json(orient='records'))
+
+def test_rewrite_with_same_size_and_mtime_is_detected(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    path = write_partition(tmp_path, 2024, 'Q1', {'Delhi': 100})
+    refresher.refresh()
+    stat = os.stat(path)
+
+    write_partition(tmp_path, 2024, 'Q1', {'Delhi': 200})
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_size == stat.st_size
+
+    assert refresher.refresh()
+    assert rows_for(refresher.snapshot()[1], 2024, 'Q1').loc['Delhi', 'registrations'] == 200
+
+def test_unreadable_partition_does_not_block_others(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    write_partition(tmp_path, 2024, 'Q1', {'Delhi': 100})
+    bad_path = os.path.join(tmp_path, '2024-Q2.csv')
+    open(bad_path, 'w').close()
+
+    assert refresher.refresh()
+    version, frame = refresher.snapshot()
+    assert version == 1
+    assert len(frame) == 1
+    assert not refresher.refresh()
+
+    # Once the file is fixed it is picked up on the next poll
+    os.remove(bad_path)
+    write_partition(tmp_path, 2024, 'Q2', {'Delhi': 150})
+    assert refresher.refresh()
+    assert rows_for(refresher.snapshot()[1], 2024, 'Q2').loc['Delhi', 'qoq_growth'] == pytest.approx(50.0)
+
+def test_broken_rewrite_keeps_previous_rows(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    path = write_partition(tmp_path, 2024, 'Q1', {'Delhi': 100})
+    write_partition(tmp_path, 2024, 'Q2', {'Delhi': 150})
+    refresher.refresh()
+
+    with open(path + '.tmp', 'w') as f:
+        f.write('year,quarter\n2024,Q1\n')
+    os.replace(path + '.tmp', path)
+    write_partition(tmp_path, 2024, 'Q2', {'Delhi': 300})
+
+    assert refresher.refresh()
+    frame = refresher.snapshot()[1]
+    assert rows_for(frame, 2024, 'Q1').loc['Delhi', 'registrations'] == 100
+    assert rows_for(frame, 2024, 'Q2').loc['Delhi', 'qoq_growth'] == pytest.approx(200.0)
+
+def test_growth_from_zero_is_nan_not_inf(tmp_path):
+    refresher = DatasetRefresher(str(tmp_path))
+    write_partition(tmp_path, 2024, 'Q1', {'Delhi': 0})
+    write_partition(tmp_path, 2024, 'Q2', {'Delhi': 50})
+    refresher.refresh()
+
+    growth = rows_for(refresher.snapshot()[1], 2024, 'Q2').loc['Delhi', 'qoq_growth']
+    assert pd.isna(growth)
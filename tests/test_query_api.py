@@ -0,0 +1,169 @@
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.query_api import QueryService, create_app
+
+class CountingLoadService(QueryService):
+    """QueryService that counts blocking dataset loads"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loads = 0
+
+    def load_data(self):
+        self.loads += 1
+        return super().load_data()
+
+class CountingService(QueryService):
+    """QueryService that counts executions and can hold workers on a gate"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.executions = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _execute(self, df, version, spec, fmt):
+        self.executions += 1
+        self.gate.wait(5)
+        return super()._execute(df, version, spec, fmt)
+
+SPEC = {'group_by': ['state'], 'measures': ['registrations']}
+
+def test_query_returns_json():
+    async def scenario():
+        service = QueryService()
+        body = json.loads(await service.query(SPEC))
+        service.close()
+        return body
+
+    body = asyncio.run(scenario())
+
+    assert body['dataset_version'] == 0
+    assert body['columns'] == ['state', 'registrations']
+    assert len(body['rows']) == 6
+
+def test_identical_concurrent_queries_are_coalesced():
+    async def scenario():
+        service = CountingService()
+        await service.refresh_data()
+        service.gate.clear()
+
+        tasks = [asyncio.create_task(service.query(SPEC)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        service.gate.set()
+        results = await asyncio.gather(*tasks)
+
+        service.close()
+        return service, results
+
+    service, results = asyncio.run(scenario())
+
+    assert service.executions == 1
+    assert len(set(results)) == 1
+
+def test_results_are_cached():
+    async def scenario():
+        service = CountingService()
+        first = await service.query(SPEC)
+        second = await service.query(dict(reversed(list(SPEC.items()))))
+        service.close()
+        return service, first, second
+
+    service, first, second = asyncio.run(scenario())
+
+    assert first == second
+    assert service.executions == 1
+
+def test_query_returns_arrow():
+    pa = pytest.importorskip('pyarrow')
+
+    async def scenario():
+        service = QueryService()
+        body = await service.query(SPEC, fmt='arrow')
+        service.close()
+        return body
+
+    table = pa.ipc.open_stream(asyncio.run(scenario())).read_all()
+
+    assert table.column_names == ['state', 'registrations']
+    assert table.schema.metadata[b'dataset_version'] == b'0'
+
+def test_cancelled_leader_keeps_query_in_flight():
+    async def scenario():
+        service = CountingService(max_pending=1)
+        await service.refresh_data()
+        service.gate.clear()
+
+        leader = asyncio.create_task(service.query(SPEC))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        await asyncio.sleep(0)
+
+        # The worker is still running, so its slot and in-flight entry remain
+        pending = service._pending
+        with pytest.raises(OverflowError):
+            await service.query({'measures': ['records']})
+
+        follower = asyncio.create_task(service.query(SPEC))
+        await asyncio.sleep(0.05)
+        service.gate.set()
+        result = await follower
+
+        service.close()
+        return service, pending, result
+
+    service, pending, result = asyncio.run(scenario())
+
+    assert pending == 1
+    assert service.executions == 1
+    assert service._pending == 0
+    assert json.loads(result)['columns'] == ['state', 'registrations']
+
+def test_http_errors():
+    async def scenario():
+        async with TestClient(TestServer(create_app(QueryService()))) as client:
+            responses = {
+                'ok': await client.post('/query', json=SPEC),
+                'invalid_spec': await client.post('/query', json={'sort_by': ['registrations']}),
+                'invalid_utf8': await client.post('/query', data=b'{"measures": ["\xff"]}'),
+                'not_json': await client.post('/query', data=b'measures'),
+                'bad_format': await client.post('/query?format=xml', json=SPEC),
+                'health': await client.get('/health')
+            }
+            return {name: response.status for name, response in responses.items()}
+
+    statuses = asyncio.run(scenario())
+
+    assert statuses == {
+        'ok': 200,
+        'invalid_spec': 400,
+        'invalid_utf8': 400,
+        'not_json': 400,
+        'bad_format': 400,
+        'health': 200
+    }
+
+def test_concurrent_first_queries_load_once(tmp_path):
+    threads_before = set(threading.enumerate())
+
+    async def scenario():
+        service = CountingLoadService(partition_dir=str(tmp_path))
+        await asyncio.gather(*[service.query({'measures': [measure]})
+                               for measure in ('registrations', 'records', 'avg_yoy_growth', 'avg_qoq_growth')])
+        service.close()
+        return service
+
+    service = asyncio.run(scenario())
+
+    assert service.loads == 1
+    assert not [thread for thread in set(threading.enumerate()) - threads_before
+                if thread.name == 'dataset-refresher']
@@ -0,0 +1,106 @@
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processor import VehicleDataProcessor
+from utils.shared_dataset import SharedDatasetStore
+
+def is_memory_mapped(array):
+    """True if ``array`` is a view whose base chain reaches an np.memmap"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+@pytest.fixture
+def sample_df():
+    return VehicleDataProcessor().data
+
+def test_publish_and_attach_round_trip(tmp_path, sample_df):
+    store = SharedDatasetStore(str(tmp_path))
+    assert store.current_version() is None
+
+    version = store.publish(sample_df)
+    df = store.attach()
+
+    assert version == store.current_version() == 1
+    assert df.attrs['dataset_version'] == 1
+    assert list(df.columns) == list(sample_df.columns)
+    assert isinstance(df['state'].dtype, pd.CategoricalDtype)
+    assert is_memory_mapped(df['registrations'].to_numpy())
+    assert is_memory_mapped(df['state'].array._codes)
+
+    for column in sample_df.columns:
+        assert df[column].astype(sample_df[column].dtype).tolist() == sample_df[column].tolist()
+
+def test_prune_keeps_recent_versions(tmp_path, sample_df):
+    store = SharedDatasetStore(str(tmp_path))
+    for _ in range(4):
+        store.publish(sample_df, keep=2)
+
+    assert store.current_version() == 4
+    assert sorted(entry for entry in os.listdir(tmp_path) if entry.startswith('v')) == ['v000003', 'v000004']
+
+def test_attach_pruned_version_falls_back_to_current(tmp_path, sample_df):
+    store = SharedDatasetStore(str(tmp_path))
+    first = store.publish(sample_df)
+    store.publish(sample_df)
+    store.publish(sample_df)
+
+    df = store.attach(first)
+
+    assert df.attrs['dataset_version'] == 3
+    assert len(df) == len(sample_df)
+
+def test_concurrent_first_publish_publishes_once(tmp_path, sample_df):
+    store_dir = str(tmp_path)
+    versions = []
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        version = SharedDatasetStore(store_dir).publish_if_missing(lambda: sample_df)
+        versions.append(version)
+        SharedDatasetStore(store_dir).attach(version)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert versions == [1, 1, 1, 1]
+    assert [entry for entry in os.listdir(tmp_path) if entry.startswith('v')] == ['v000001']
+
+def test_concurrent_publishes_never_move_current_backwards(tmp_path, sample_df):
+    store_dir = str(tmp_path)
+    barrier = threading.Barrier(6)
+
+    def worker():
+        barrier.wait()
+        SharedDatasetStore(store_dir).publish(sample_df, keep=10)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store = SharedDatasetStore(store_dir)
+    assert store.current_version() == 6
+    assert not os.path.exists(os.path.join(store_dir, SharedDatasetStore.LOCK_FILE))
+
+def test_publish_tolerates_lock_removed_as_stale(tmp_path, sample_df):
+    store = SharedDatasetStore(str(tmp_path))
+    lock_path = os.path.join(str(tmp_path), SharedDatasetStore.LOCK_FILE)
+
+    # Simulate another process breaking our lock while we hold it
+    version = store.publish_if_missing(lambda: (os.remove(lock_path), sample_df)[1])
+
+    assert version == 1
+    assert store.attach().attrs['dataset_version'] == 1
@@ -2,11 +2,83 @@
 import pandas as pd
 import numpy as np
 
+class VehicleDataProcessor:
+    def __init__(self):
+        self.data = self.generate_sample_data()
+
+    def generate_sample_data(self):
+        """Generate sample vehicle registration data"""
+        np.random.seed(42)
+
+        states = ['Maharashtra', 'Gujarat', 'Tamil Nadu', 'Karnataka', 'Delhi', 'Uttar Pradesh']
+        categories = ['2-Wheeler', '3-Wheeler', '4-Wheeler', 'Commercial Vehicle']
+        manufacturers = ['Hero MotoCorp', 'Honda Motorcycle', 'Maruti Suzuki', 'Bajaj Auto', 
+                        'TVS Motor', 'Tata Motors', 'Hyundai', 'Mahindra']
+        years = [2021, 2022, 2023, 2024]
+        quarters = ['Q1', 'Q2', 'Q3', 'Q4']
+
+        data = []
+        for year in years:
+            for quarter in quarters:
+                for state in states:
+                    for category in categories:
+                        for manufacturer in manufacturers:
+                            if np.random.random() > 0.7:  # Not all combinations exist
+                                continue
+
+                            base_registrations = np.random.randint(10000, 200000)
+                            yoy_growth = np.random.normal(8, 15)  # 8% average with 15% std dev
+                            qoq_growth = np.random.normal(2, 8)   # 2% average with 8% std dev
+
+                            data.append({
+                                'year': year,
+                                'quarter': quarter,
+                                'state': state,
+                                'category': category,
+                                'manufacturer': manufacturer,
+                                'registrations': base_registrations,
+                                'yoy_growth': yoy_growth,
+                                'qoq_growth': qoq_growth,
+                                'date_period': f"{year}-{quarter}"
+                            })
+
+        return pd.DataFrame(data)
+
+    def calculate_summary_metrics(self, df):
+        """Calculate key summary metrics"""
+        total_registrations = df['registrations'].sum()
+        avg_yoy_growth = df['yoy_growth'].mean()
+        avg_qoq_growth = df['qoq_growth'].mean()
+
+        top_category = df.groupby('category', observed=True)['registrations'].sum().idxmax()
+        top_manufacturer = df.groupby('manufacturer', observed=True)['registrations'].sum().idxmax()
+        top_state = df.groupby('state', observed=True)['registrations'].sum().idxmax()
+
+        return {
+            'total_registrations': total_registrations,
+            'avg_yoy_growth': avg_yoy_growth,
+            'avg_qoq_growth': avg_qoq_growth,
+            'top_category': top_category,
+            'top_manufacturer': top_manufacturer,
+            'top_state': top_state
+        }
+
 class VahanDataProcessor:
     """
     Data processor for vehicle registration data from Vahan portal
     """
 
+    # Supported query measures: output name -> (source column, aggregation)
+    QUERY_MEASURES = {
+        'registrations': ('registrations', 'sum'),
+        'avg_yoy_growth': ('yoy_growth', 'mean'),
+        'avg_qoq_growth': ('qoq_growth', 'mean'),
+        'records': ('registrations', 'size')
+    }
+    # Measures derived from the aggregated registrations
+    DERIVED_MEASURES = ('market_share', 'rank')
+    QUERY_DIMENSIONS = ('year', 'quarter', 'state', 'category', 'manufacturer')
+
     def __init__(self):
         self.data = None
 
@@ -50,18 +122,137 @@ class VahanDataProcessor:
 
     def filter_data(self, df, filters):
         """Apply filters to dataframe"""
-        filtered_df = df.copy()
+        # Combine all conditions into one mask so the frame is sliced once
+        mask = np.ones(len(df), dtype=bool)
 
         if filters.get('years'):
-            filtered_df = filtered_df[filtered_df['year'].isin(filters['years'])]
+            mask &= df['year'].isin(filters['years']).to_numpy()
 
         if filters.get('states'):
-            filtered_df = filtered_df[filtered_df['state'].isin(filters['states'])]
+            mask &= df['state'].isin(filters['states']).to_numpy()
 
         if filters.get('categories'):
-            filtered_df = filtered_df[filtered_df['category'].isin(filters['categories'])]
+            mask &= df['category'].isin(filters['categories']).to_numpy()
 
         if filters.get('manufacturers'):
-            filtered_df = filtered_df[filtered_df['manufacturer'].isin(filters['manufacturers'])]
+            mask &= df['manufacturer'].isin(filters['manufacturers']).to_numpy()
+
+        return df[mask]
+
+    def validate_query(self, spec):
+        """Check a query spec, raising ValueError describing the first problem"""
+        unknown = set(spec) - {'filters', 'group_by', 'measures', 'sort_by', 'ascending', 'limit'}
+        if unknown:
+            raise ValueError(f"Unknown query fields: {', '.join(sorted(unknown))}")
+
+        filters = self._query_field(spec, 'filters', {})
+        if not isinstance(filters, dict):
+            raise ValueError("'filters' must be an object")
+
+        for key, values in filters.items():
+            if key not in ('years', 'states', 'categories', 'manufacturers'):
+                raise ValueError(f"Unknown filter: {key}")
+            if not isinstance(values, list):
+                raise ValueError(f"Filter '{key}' must be a list")
+            for value in values:
+                if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                    raise ValueError(f"Filter '{key}' values must be strings or numbers")
+
+        group_by = self._query_field(spec, 'group_by', [])
+        if not isinstance(group_by, list) or not all(isinstance(column, str) for column in group_by):
+            raise ValueError("'group_by' must be a list of column names")
+        for column in group_by:
+            if column not in self.QUERY_DIMENSIONS:
+                raise ValueError(f"Unknown group_by column: {column}")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("'group_by' contains duplicate columns")
+
+        measures = self._query_field(spec, 'measures', ['registrations'])
+        if not isinstance(measures, list) or not all(isinstance(measure, str) for measure in measures):
+            raise ValueError("'measures' must be a list of measure names")
+        if not measures:
+            raise ValueError("'measures' must not be empty")
+        for measure in measures:
+            if measure not in self.QUERY_MEASURES and measure not in self.DERIVED_MEASURES:
+                raise ValueError(f"Unknown measure: {measure}")
+        if len(set(measures)) != len(measures):
+            raise ValueError("'measures' contains duplicate measures")
+
+        sort_by = spec.get('sort_by')
+        if sort_by is not None:
+            if not isinstance(sort_by, str):
+                raise ValueError("'sort_by' must be a column name")
+            if sort_by not in group_by and sort_by not in measures:
+                raise ValueError(f"Cannot sort by: {sort_by}")
+
+        if not isinstance(self._query_field(spec, 'ascending', False), bool):
+            raise ValueError("'ascending' must be true or false")
+
+        limit = spec.get('limit')
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit <= 0):
+            raise ValueError("'limit' must be a positive integer")
+
+    def run_query(self, df, spec):
+        """
+        Run a filter + group-by + measures query over the dataset
+
+        Args:
+            df (pandas.DataFrame): Dataset to query
+            spec (dict): Query spec, e.g.
+                {'filters': {'years': [2024]}, 'group_by': ['state'],
+                 'measures': ['registrations', 'market_share', 'rank'],
+                 'sort_by': 'registrations', 'ascending': False, 'limit': 10}
+
+        Returns:
+            pandas.DataFrame: One row per group (a single row if group_by is empty)
+        """
+        self.validate_query(spec)
+
+        filters = self._query_field(spec, 'filters', {})
+        group_by = self._query_field(spec, 'group_by', [])
+        measures = self._query_field(spec, 'measures', ['registrations'])
+
+        filtered_df = self.filter_data(df, filters)
+
+        # Derived measures are computed from summed registrations
+        aggregations = {name: self.QUERY_MEASURES[name] for name in measures if name in self.QUERY_MEASURES}
+        if any(name in self.DERIVED_MEASURES for name in measures):
+            aggregations.setdefault('registrations', self.QUERY_MEASURES['registrations'])
+
+        if group_by:
+            result = filtered_df.groupby(group_by, observed=True).agg(**aggregations).reset_index()
+        else:
+            result = pd.DataFrame([{
+                name: len(filtered_df) if func == 'size' else getattr(filtered_df[column], func)()
+                for name, (column, func) in aggregations.items()
+            }])
+
+        return self.finish_query(result, spec)
+
+    def finish_query(self, result, spec):
+        """Add derived measures, then sort and limit an aggregated query result"""
+        group_by = self._query_field(spec, 'group_by', [])
+        measures = self._query_field(spec, 'measures', ['registrations'])
+
+        if 'market_share' in measures:
+            total = result['registrations'].sum()
+            result['market_share'] = result['registrations'] / total * 100 if total else 0.0
+
+        if 'rank' in measures:
+            result['rank'] = result['registrations'].rank(ascending=False, method='min').astype(int)
+
+        result = result[group_by + measures]
+
+        if spec.get('sort_by') is not None:
+            result = result.sort_values(spec['sort_by'], ascending=self._query_field(spec, 'ascending', False))
+
+        if spec.get('limit') is not None:
+            result = result.head(spec['limit'])
+
+        return result.reset_index(drop=True)
 
-        return filtered_df
+    @staticmethod
+    def _query_field(spec, name, default):
+        """Return a query spec field, using ``default`` only if it is missing or null"""
+        value = spec.get(name)
+        return default if value is None else value
@@ -0,0 +1,291 @@
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processor import VehicleDataProcessor
+from utils.shared_dataset import SharedDatasetStore
+
+class DatasetRefresher:
+    """
+    Background refresher that merges changed data partitions into the dataset
+
+    Watches a directory of ``<year>-<quarter>.csv`` partition files (as
+    written by ``VahanScraper.save_partitions``). Only new, changed or
+    removed partitions are re-read; their rows replace the old ones in the
+    in-memory frame, growth rates are recomputed for them and for the
+    quarters that depend on them, and per-partition aggregates are updated.
+    Each change bumps ``version`` (also stored in ``frame.attrs``) so
+    downstream caches can key on it.
+
+    Partition files override the matching quarter of ``base_df``; removing
+    a file restores that quarter's base rows, or drops the quarter if the
+    base data has none. Growth for base rows is left as provided.
+    """
+
+    QUARTER_ORDER = {'Q1': 1, 'Q2': 2, 'Q3': 3, 'Q4': 4}
+    SERIES_KEYS = ['state', 'category', 'manufacturer']
+    AGGREGATE_DIMENSIONS = ('state', 'category', 'manufacturer')
+
+    def __init__(self, partition_dir, base_df=None, store_dir=None, interval=5.0):
+        self.partition_dir = partition_dir
+        self.store = SharedDatasetStore(store_dir) if store_dir else None
+        self.interval = interval
+
+        self.frame = base_df.copy(deep=False) if base_df is not None else pd.DataFrame()
+        self.aggregates = {}
+        self.version = 0
+
+        self._base_partitions = {}
+        self._partitions = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if not self.frame.empty:
+            for key, partition in self.frame.groupby(['year', 'quarter']):
+                self._base_partitions[key] = partition
+                self._partitions[key] = partition
+                self.aggregates[key] = self._aggregate(partition)
+
+        if self.store is not None and not self.frame.empty:
+            self.version = self.store.publish(self.frame)
+        self.frame.attrs['dataset_version'] = self.version
+
+    def snapshot(self):
+        """Return (version, frame); the frame is replaced, never mutated"""
+        with self._lock:
+            return self.version, self.frame
+
+    def totals(self, dimension, version=None):
+        """
+        Total registrations by state, category or manufacturer
+
+        Returns None if ``version`` is given and is no longer the current one.
+        """
+        with self._lock:
+            if version is not None and version != self.version:
+                return None
+            aggregates = list(self.aggregates.values())
+
+        if not aggregates:
+            return pd.Series(dtype='int64')
+
+        return pd.concat([agg[dimension] for agg in aggregates]).groupby(level=0).sum()
+
+    def start(self):
+        """Start polling the partition directory in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='dataset-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Dataset refresh failed: {e}")
+
+            if self._stop.wait(self.interval):
+                break
+
+    def refresh(self):
+        """
+        Merge changed partitions into the dataset
+
+        A partition file that cannot be read is skipped and retried on the
+        next poll; its previous rows stay in place and the other changes
+        are still merged.
+
+        Returns:
+            bool: True if the dataset changed
+        """
+        changed, removed, signatures = self._scan()
+        if not changed and not removed:
+            return False
+
+        loaded = {}
+        for key, path in changed.items():
+            try:
+                loaded[key] = self._read_partition(path)
+            except Exception as e:
+                print(f"Skipping partition {path}: {e}")
+                # Keep the last good signature (if any) so the file is retried
+                if key in self._signatures:
+                    signatures[key] = self._signatures[key]
+                else:
+                    del signatures[key]
+
+        if not loaded and not removed:
+            return False
+
+        restored = {key: self._base_partitions[key] for key in removed if key in self._base_partitions}
+        touched = set(loaded) | set(removed)
+
+        partitions = dict(self._partitions)
+        for key in removed:
+            partitions.pop(key, None)
+        partitions.update(restored)
+        partitions.update(loaded)
+
+        # A partition's growth also feeds the next quarter and the same quarter
+        # next year; only quarters that come from partition files are recomputed
+        dependents = set()
+        for year, quarter in touched:
+            dependents.add(self._next_quarter(year, quarter))
+            dependents.add((year + 1, quarter))
+        recompute = (set(loaded) | dependents) & set(signatures) & set(partitions)
+
+        for key in recompute:
+            partitions[key] = self._with_growth(partitions, key)
+
+        # Swap only the affected quarters' rows in the frame
+        replaced = touched | recompute
+        frame = self.frame
+        if not frame.empty:
+            frame = frame[~self._partition_mask(frame, replaced)]
+        frame = pd.concat(
+            [frame] + [partitions[key] for key in sorted(replaced) if key in partitions], ignore_index=True
+        )
+
+        aggregates = dict(self.aggregates)
+        for key in removed:
+            aggregates.pop(key, None)
+        for key, partition in {**restored, **loaded}.items():
+            aggregates[key] = self._aggregate(partition)
+
+        if self.store is not None:
+            version = self.store.publish(frame)
+        else:
+            version = self.version + 1
+        frame.attrs['dataset_version'] = version
+
+        with self._lock:
+            self.frame = frame
+            self.aggregates = aggregates
+            self.version = version
+            self._partitions = partitions
+            self._signatures = signatures
+
+        return True
+
+    def _scan(self):
+        """Compare partition files with the last seen (mtime, size, inode) signatures"""
+        signatures = {}
+        if os.path.isdir(self.partition_dir):
+            for entry in os.scandir(self.partition_dir):
+                key = self._parse_partition_name(entry.name)
+                if key is not None and entry.is_file():
+                    # save_partitions renames files into place, so a rewrite
+                    # always changes the inode even if mtime and size do not
+                    stat = entry.stat()
+                    signatures[key] = (entry.path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        changed = {key: sig[0] for key, sig in signatures.items() if self._signatures.get(key) != sig}
+        removed = [key for key in self._signatures if key not in signatures]
+        return changed, removed, signatures
+
+    def _read_partition(self, path):
+        partition = pd.read_csv(path)
+        missing = {'year', 'quarter', 'registrations', *self.SERIES_KEYS} - set(partition.columns)
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(sorted(missing))}")
+        partition['date_period'] = partition['year'].astype(str) + '-' + partition['quarter']
+        return partition
+
+    def _with_growth(self, partitions, key):
+        """
+        Recompute YoY/QoQ growth for one partition
+
+        Only the previous quarter and the same quarter last year are looked
+        up. Growth is NaN when the series has no earlier value or it was 0.
+        """
+        year, quarter = key
+        rows = partitions[key]
+        series = pd.MultiIndex.from_frame(rows[self.SERIES_KEYS])
+
+        growth = {}
+        for column, previous_key in (('qoq_growth', self._previous_quarter(year, quarter)),
+                                     ('yoy_growth', (year - 1, quarter))):
+            previous = partitions.get(previous_key)
+            if previous is None:
+                growth[column] = np.nan
+                continue
+
+            previous = previous.groupby(self.SERIES_KEYS, observed=True)['registrations'].sum()
+            previous = previous.replace(0, np.nan).reindex(series).to_numpy(dtype=float)
+            growth[column] = (rows['registrations'].to_numpy() / previous - 1) * 100
+
+        return rows.assign(**growth)
+
+    def _period_index(self, df):
+        return df['year'].to_numpy() * 4 + df['quarter'].map(self.QUARTER_ORDER).to_numpy() - 1
+
+    def _partition_mask(self, df, keys):
+        periods = [year * 4 + self.QUARTER_ORDER[quarter] - 1 for year, quarter in keys]
+        return np.isin(self._period_index(df), periods)
+
+    def _aggregate(self, partition):
+        return {
+            dim: partition.groupby(dim, observed=True)['registrations'].sum()
+            for dim in self.AGGREGATE_DIMENSIONS
+        }
+
+    def _previous_quarter(self, year, quarter):
+        if quarter == 'Q1':
+            return year - 1, 'Q4'
+        return year, f"Q{self.QUARTER_ORDER[quarter] - 1}"
+
+    def _next_quarter(self, year, quarter):
+        if quarter == 'Q4':
+            return year + 1, 'Q1'
+        return year, f"Q{self.QUARTER_ORDER[quarter] + 1}"
+
+    def _parse_partition_name(self, name):
+        """Parse '2024-Q3.csv' into (2024, 'Q3')"""
+        if not name.endswith('.csv') or name.startswith('.'):
+            return None
+        year, _, quarter = name[:-len('.csv')].partition('-')
+        if not year.isdigit() or quarter not in self.QUARTER_ORDER:
+            return None
+        return int(year), quarter
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish dataset partitions to the shared store as they change")
+    parser.add_argument('--partitions', required=True, help="Directory of <year>-<quarter>.csv partitions")
+    parser.add_argument('--store', default=os.environ.get('VEHICLE_DATA_STORE'),
+                        help="Shared dataset store directory (defaults to $VEHICLE_DATA_STORE)")
+    parser.add_argument('--interval', type=float, default=5.0, help="Polling interval in seconds")
+    args = parser.parse_args()
+
+    if not args.store:
+        parser.error("--store or VEHICLE_DATA_STORE is required")
+
+    refresher = DatasetRefresher(
+        args.partitions,
+        base_df=VehicleDataProcessor().data,
+        store_dir=args.store,
+        interval=args.interval
+    )
+    refresher.start()
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        refresher.stop()
+
+if __name__ == "__main__":
+    main()
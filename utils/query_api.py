@@ -0,0 +1,273 @@
+
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from utils.data_processor import VahanDataProcessor, VehicleDataProcessor
+from utils.dataset_refresher import DatasetRefresher
+from utils.shared_dataset import SharedDatasetStore
+
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+class QueryService:
+    """
+    Query engine behind the HTTP API
+
+    Results are cached per (dataset version, query, format). Identical
+    queries that arrive while one is already running wait on the same
+    future instead of being computed again, and all computation runs on a
+    bounded thread pool so the event loop stays responsive. The dataset is
+    loaded on that pool too, and re-checked in the background every
+    ``poll_interval`` seconds rather than on each request.
+
+    With ``partition_dir`` the service runs its own DatasetRefresher, and
+    unfiltered totals by state, category or manufacturer are answered from
+    the refresher's per-partition aggregates instead of the full frame.
+    """
+
+    TOTALS_MEASURES = {'registrations', 'market_share', 'rank'}
+
+    def __init__(self, store_dir=None, partition_dir=None, max_workers=4, max_pending=64,
+                 cache_size=256, poll_interval=5.0):
+        self.store_dir = store_dir
+        self.partition_dir = partition_dir
+        self.refresher = None
+        self.processor = VahanDataProcessor()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='query')
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._pending = 0
+        self._data = None
+        self._version = None
+        self._load_lock = asyncio.Lock()
+
+    def snapshot(self):
+        """Return (version, dataset) currently being served"""
+        return self._version, self._data
+
+    def load_data(self):
+        """Return (version, dataset), attaching only when a new version is published (blocking)"""
+        if self.partition_dir:
+            if self.refresher is None:
+                refresher = DatasetRefresher(
+                    self.partition_dir, base_df=VehicleDataProcessor().data, interval=self.poll_interval
+                )
+                refresher.refresh()
+                self.refresher = refresher.start()
+            return self.refresher.snapshot()
+
+        if not self.store_dir:
+            if self._data is None:
+                return 0, VehicleDataProcessor().data
+            return self._version, self._data
+
+        store = SharedDatasetStore(self.store_dir)
+        version = store.publish_if_missing(lambda: VehicleDataProcessor().data)
+        if version == self._version:
+            return self._version, self._data
+
+        df = store.attach(version)
+        return df.attrs['dataset_version'], df
+
+    async def refresh_data(self):
+        """Load the latest dataset on the worker pool and start serving it"""
+        # Serialized so concurrent first queries and the watcher never load
+        # (or create a DatasetRefresher) at the same time
+        async with self._load_lock:
+            await self._load()
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
+        self._version, self._data = await loop.run_in_executor(self.executor, self.load_data)
+
+    async def watch_data(self):
+        """Keep picking up newly published dataset versions"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh_data()
+            except Exception as e:
+                print(f"Dataset reload failed: {e}")
+
+    async def query(self, spec, fmt='json'):
+        """
+        Run a query and return the serialized result
+
+        Raises:
+            ValueError: If the spec is invalid
+            OverflowError: If too many distinct queries are already pending
+        """
+        self.processor.validate_query(spec)
+
+        if self._data is None:
+            # Only the first of several concurrent first queries loads
+            async with self._load_lock:
+                if self._data is None:
+                    await self._load()
+
+        version, df = self.snapshot()
+        key = (version, json.dumps(spec, sort_keys=True), fmt)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        # Coalesce with an identical query that is already running
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        if self._pending >= self.max_pending:
+            raise OverflowError("Too many pending queries")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._execute, df, version, spec, fmt)
+        self._inflight[key] = future
+        self._pending += 1
+
+        # Bookkeeping follows the worker, not the caller, so cancelling the
+        # request that started a query does not release its slot early
+        def finished(future):
+            self._inflight.pop(key, None)
+            self._pending -= 1
+            if not future.cancelled() and future.exception() is None:
+                self._cache[key] = future.result()
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        future.add_done_callback(finished)
+        return await asyncio.shield(future)
+
+    def _execute(self, df, version, spec, fmt):
+        """Compute and serialize a query result (runs on the worker pool)"""
+        result = self._totals_result(version, spec)
+        if result is None:
+            result = self.processor.run_query(df, spec)
+
+        if fmt == 'arrow':
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(result, preserve_index=False)
+            table = table.replace_schema_metadata({'dataset_version': str(version)})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes()
+
+        payload = {
+            'dataset_version': version,
+            'columns': list(result.columns),
+            'rows': json.loads(result.to_json(orient='records'))
+        }
+        return json.dumps(payload).encode('utf-8')
+
+    def _totals_result(self, version, spec):
+        """Answer unfiltered single-dimension totals from the refresher's aggregates"""
+        group_by = spec.get('group_by') or []
+        measures = spec.get('measures') or ['registrations']
+
+        if (self.refresher is None or spec.get('filters') or len(group_by) != 1
+                or group_by[0] not in DatasetRefresher.AGGREGATE_DIMENSIONS
+                or not set(measures) <= self.TOTALS_MEASURES):
+            return None
+
+        totals = self.refresher.totals(group_by[0], version)
+        if totals is None:
+            return None
+
+        result = totals.rename_axis(group_by[0]).reset_index(name='registrations')
+        return self.processor.finish_query(result, spec)
+
+    def close(self):
+        if self.refresher is not None:
+            self.refresher.stop()
+        self.executor.shutdown(wait=False)
+
+SERVICE_KEY = web.AppKey('service', QueryService)
+
+async def handle_query(request):
+    """POST /query with a JSON query spec; ?format=arrow for Arrow IPC output"""
+    service = request.app[SERVICE_KEY]
+
+    try:
+        spec = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return web.json_response({'error': 'Request body must be JSON'}, status=400)
+
+    if not isinstance(spec, dict):
+        return web.json_response({'error': 'Query spec must be a JSON object'}, status=400)
+
+    fmt = request.query.get('format')
+    if fmt is None:
+        fmt = 'arrow' if ARROW_CONTENT_TYPE in request.headers.get('Accept', '') else 'json'
+    if fmt not in ('json', 'arrow'):
+        return web.json_response({'error': f"Unsupported format: {fmt}"}, status=400)
+
+    try:
+        body = await service.query(spec, fmt)
+    except ValueError as e:
+        return web.json_response({'error': str(e)}, status=400)
+    except OverflowError as e:
+        return web.json_response({'error': str(e)}, status=503)
+
+    content_type = ARROW_CONTENT_TYPE if fmt == 'arrow' else 'application/json'
+    return web.Response(body=body, content_type=content_type)
+
+async def handle_health(request):
+    """GET /health"""
+    service = request.app[SERVICE_KEY]
+    version, df = service.snapshot()
+    if df is None:
+        return web.json_response({'status': 'loading'}, status=503)
+    return web.json_response({'status': 'ok', 'dataset_version': version, 'rows': len(df)})
+
+def create_app(service):
+    """Create the aiohttp application for a QueryService"""
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.router.add_post('/query', handle_query)
+    app.router.add_get('/health', handle_health)
+
+    async def dataset_watcher(app):
+        await app[SERVICE_KEY].refresh_data()
+        task = asyncio.create_task(app[SERVICE_KEY].watch_data())
+        yield
+        task.cancel()
+        app[SERVICE_KEY].close()
+
+    app.cleanup_ctx.append(dataset_watcher)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Vehicle registration query API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4, help="Size of the query worker pool")
+    parser.add_argument('--max-pending', type=int, default=64, help="Distinct queries allowed in flight")
+    parser.add_argument('--cache-size', type=int, default=256, help="Number of cached query results")
+    parser.add_argument('--store', default=os.environ.get('VEHICLE_DATA_STORE'),
+                        help="Shared dataset store directory (defaults to $VEHICLE_DATA_STORE)")
+    parser.add_argument('--partitions', default=os.environ.get('VEHICLE_PARTITION_DIR'),
+                        help="Partition directory to refresh from when no store is used "
+                             "(defaults to $VEHICLE_PARTITION_DIR)")
+    args = parser.parse_args()
+
+    service = QueryService(
+        store_dir=args.store,
+        partition_dir=None if args.store else args.partitions,
+        max_workers=args.workers,
+        max_pending=args.max_pending,
+        cache_size=args.cache_size
+    )
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+class SharedDatasetStore:
+    """
+    Versioned, memory-mapped column store shared by every dashboard process.
+
+    Layout of ``root_dir``::
+
+        CURRENT              -> {"version": 3, "path": "v000003"}
+        v000003/manifest.json
+        v000003/<column>.npy
+
+    Each version directory is written once and never modified. Publishing a
+    new version swaps the ``CURRENT`` header with ``os.replace`` so readers
+    either see the old or the new version, never a partial one. Readers map
+    the ``.npy`` files read-only, so every process attached to the same
+    version shares the same physical pages.
+    """
+
+    FORMAT_VERSION = 1
+    HEADER_FILE = 'CURRENT'
+    MANIFEST_FILE = 'manifest.json'
+    LOCK_FILE = '.publish.lock'
+    ATTACH_RETRIES = 3
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def current_version(self):
+        """Return the published version number, or None if nothing is published"""
+        header = self._read_header()
+        return header['version'] if header else None
+
+    def publish(self, df, keep=2):
+        """
+        Write a DataFrame as a new dataset version and make it current
+
+        Args:
+            df (pandas.DataFrame): Dataset to publish
+            keep (int): Number of most recent versions to keep on disk
+
+        Returns:
+            int: The newly published version number
+        """
+        version = self._write_version(df)
+
+        # Compare and swap under the lock so CURRENT never moves backwards
+        with self._publish_lock():
+            current = self.current_version()
+            if current is None or version > current:
+                self._write_header(version)
+
+        self.prune(keep)
+        return version
+
+    def publish_if_missing(self, make_df, timeout=60.0):
+        """
+        Return the current version, publishing ``make_df()`` if there is none
+
+        Only one process publishes the first version: the others wait for
+        it instead of each publishing (and then pruning) their own copy.
+
+        Args:
+            make_df (callable): Returns the DataFrame to publish
+            timeout (float): Seconds after which a leftover lock is considered stale
+
+        Returns:
+            int: The current version number
+        """
+        version = self.current_version()
+        if version is not None:
+            return version
+
+        with self._publish_lock(timeout):
+            version = self.current_version()
+            if version is None:
+                version = self._write_version(make_df())
+                self._write_header(version)
+            return version
+
+    def attach(self, version=None):
+        """
+        Attach to a published version as a read-only DataFrame
+
+        Numeric columns are zero-copy views over the memory-mapped files.
+        Text columns are returned as categoricals whose codes are mapped the
+        same way; only the (small) category labels live in process memory.
+        If the requested version has been pruned in the meantime, the
+        current version is attached instead; ``df.attrs['dataset_version']``
+        tells which one was used.
+
+        Args:
+            version (int): Version to attach to, defaults to the current one
+
+        Returns:
+            pandas.DataFrame: Read-only dataset
+        """
+        for attempt in range(self.ATTACH_RETRIES):
+            if version is None:
+                version = self.current_version()
+                if version is None:
+                    raise FileNotFoundError(f"No dataset published in {self.root_dir}")
+
+            try:
+                return self._attach_version(version)
+            except FileNotFoundError:
+                # Pruned by newer publishes after the caller read CURRENT
+                current = self.current_version()
+                if current is None or current == version or attempt == self.ATTACH_RETRIES - 1:
+                    raise
+                version = current
+
+    def _attach_version(self, version):
+        version_path = os.path.join(self.root_dir, self._version_dir(version))
+        with open(os.path.join(version_path, self.MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        if manifest['format'] != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format: {manifest['format']}")
+
+        data = {}
+        for column in manifest['columns']:
+            values = np.load(os.path.join(version_path, column['file']), mmap_mode='r')
+            if column['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, categories=column['categories'])
+            data[column['name']] = values
+
+        df = pd.DataFrame(data, copy=False)
+        df.attrs['dataset_version'] = version
+        return df
+
+    def prune(self, keep=2):
+        """Remove old version directories, always keeping the current one"""
+        current = self.current_version()
+        versions = sorted(self._versions_on_disk(), reverse=True)
+
+        for version in versions[keep:]:
+            if version != current:
+                # Attached readers keep their mappings alive after the unlink
+                shutil.rmtree(os.path.join(self.root_dir, self._version_dir(version)), ignore_errors=True)
+
+    def _write_version(self, df):
+        """Write a DataFrame into the next free version directory and return its number"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=self.root_dir)
+
+        try:
+            columns = [self._write_column(staging_dir, name, df[name]) for name in df.columns]
+
+            # Claim the next free version directory; os.rename fails if another
+            # publisher got there first, in which case we try the next number
+            version = self._latest_version_on_disk() + 1
+            while True:
+                manifest = {
+                    'format': self.FORMAT_VERSION,
+                    'version': version,
+                    'rows': len(df),
+                    'created': time.time(),
+                    'columns': columns
+                }
+                with open(os.path.join(staging_dir, self.MANIFEST_FILE), 'w') as f:
+                    json.dump(manifest, f)
+
+                try:
+                    os.rename(staging_dir, os.path.join(self.root_dir, self._version_dir(version)))
+                    break
+                except OSError:
+                    version += 1
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        return version
+
+    @contextlib.contextmanager
+    def _publish_lock(self, timeout=60.0):
+        """
+        Hold the store-wide publish lock file
+
+        Args:
+            timeout (float): Seconds after which a leftover lock is considered stale
+        """
+        os.makedirs(self.root_dir, exist_ok=True)
+        lock_path = os.path.join(self.root_dir, self.LOCK_FILE)
+
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                # Another process holds the lock; break it if that process died
+                with contextlib.suppress(FileNotFoundError):
+                    if time.time() - os.path.getmtime(lock_path) > timeout:
+                        os.remove(lock_path)
+                time.sleep(0.05)
+
+        try:
+            yield
+        finally:
+            # The lock may already have been broken as stale by another process
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(lock_path)
+
+    def _write_column(self, directory, name, series):
+        """Write one column as an .npy file and return its manifest entry"""
+        file_name = f"{name}.npy"
+        entry = {'name': name, 'file': file_name}
+
+        if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            categorical = series.astype('category')
+            values = categorical.cat.codes.to_numpy()
+            entry['kind'] = 'category'
+            entry['categories'] = categorical.cat.categories.tolist()
+
+        entry['dtype'] = values.dtype.str
+        np.save(os.path.join(directory, file_name), np.ascontiguousarray(values))
+        return entry
+
+    def _read_header(self):
+        try:
+            with open(os.path.join(self.root_dir, self.HEADER_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_header(self, version):
+        fd, tmp_path = tempfile.mkstemp(prefix='.header-', dir=self.root_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': version, 'path': self._version_dir(version)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root_dir, self.HEADER_FILE))
+
+    def _versions_on_disk(self):
+        versions = []
+        for entry in os.listdir(self.root_dir):
+            if entry.startswith('v') and entry[1:].isdigit():
+                versions.append(int(entry[1:]))
+        return versions
+
+    def _latest_version_on_disk(self):
+        return max(self._versions_on_disk(), default=0)
+
+    @staticmethod
+    def _version_dir(version):
+        return f"v{version:06d}"
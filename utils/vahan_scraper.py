@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 import time
+import os
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 import json
@@ -69,6 +70,32 @@ class VahanScraper:
 
         return pd.DataFrame(data)
 
+    def save_partitions(self, df, partition_dir):
+        """
+        Write scraped data as one CSV file per year/quarter partition
+
+        Each file is written to a temporary name and renamed into place, so a
+        DatasetRefresher watching the directory never reads a partial file.
+
+        Args:
+            df (pandas.DataFrame): Scraped vehicle registration data
+            partition_dir (str): Directory watched by the dataset refresher
+
+        Returns:
+            list: Paths of the partition files written
+        """
+        os.makedirs(partition_dir, exist_ok=True)
+        paths = []
+
+        for (year, quarter), partition in df.groupby(['year', 'quarter']):
+            path = os.path.join(partition_dir, f"{year}-{quarter}.csv")
+            tmp_path = os.path.join(partition_dir, f".{year}-{quarter}.csv.tmp")
+            partition.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            paths.append(path)
+
+        return paths
+
     def process_response(self, json_data, year, quarter):
         """Process JSON API response into structured data"""
         processed = []
@@ -156,3 +183,4 @@ class VahanScraper:
 # scraper = VahanScraper()
 # data = scraper.scrape_vehicle_data(2022, 2024)
 # data.to_csv('vahan_data.csv', index=False)
+# scraper.save_partitions(data, 'data/partitions')